@@ -4,23 +4,107 @@ Xbox Controller Client
 Receives and displays controller data from the server and controls motors.
 """
 
+import argparse
+import logging
+import selectors
+import signal
 import socket
 import json
+import threading
 import time
 import sys
 
+# JSON bodies must be strict JSON (no NaN or Infinity): orjson rejects what
+# ujson and the json module would accept
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    try:
+        import ujson
+
+        def json_loads(data):
+            """Fallback parser accepting the memoryviews orjson takes"""
+            return ujson.loads(bytes(data))
+    except ImportError:
+        def json_loads(data):
+            """Fallback parser accepting the memoryviews orjson takes"""
+            return json.loads(bytes(data))
+
+from common.protocol import (BUTTON_NAMES, HEADER, MIN_PACKET_SIZE,
+                             PACKET_JSON, PACKET_STATE, STATE_FRAME)
+from common.realtime import enable_realtime, reduce_switch_interval
+
 from .motor_controller import MotorController
+from .udp_batch import BatchReceiver
+
+logger = logging.getLogger(__name__)
+
+# Time between terminal redraws by the display thread (30 Hz)
+DISPLAY_INTERVAL = 1 / 30
+
+# The server re-sends unchanged state every 200 ms. Without any frame for
+# this long the link is considered lost and the motors are stopped.
+LINK_TIMEOUT = 1.0
+
+# Triggers read a few percent at rest, throttle below this is treated as 0
+TRIGGER_DEADZONE = 0.05
+
+# Throttle is quantized to steps of this many percent
+THROTTLE_STEP = 5
+
+# Template of one display frame, compiled once instead of per redraw
+_format_frame = (
+    # Clear screen (works on most terminals)
+    "\033[2J\033[H"
+    + "=" * 60 + "\n"
+    + "Xbox Controller State\n"
+    + "=" * 60 + "\n"
+    # Sticks
+    + "Left Stick:  X={:6.3f} Y={:6.3f}\n"
+    + "Right Stick: X={:6.3f} Y={:6.3f}\n"
+    # Triggers
+    + "Triggers:    L={:6.3f} R={:6.3f}\n"
+    + "{}\n"
+    # Delay
+    + "Delay:       avg={:7.2f} ms over {} packets\n"
+    + "\n" + "=" * 60 + "\n"
+).format
+
+# Kernel receive buffer size, large enough to absorb bursts while the
+# receive thread is descheduled (the kernel may cap it at net.core.rmem_max)
+RECV_BUFFER_SIZE = 1 << 20
 
 
 class XboxControllerClient:
-    def __init__(self, server_ip='127.0.0.1', server_port=5000, client_port=5001):
+    def __init__(self, server_ip='127.0.0.1', server_port=5000, client_port=5001,
+                 cpu=None, realtime=False):
         self.server_ip = server_ip
         self.server_port = server_port
         self.client_port = client_port
+        self.cpu = cpu
+        self.realtime = realtime
         self.running = False
+        self.receive_thread = None
+        self._stop_event = threading.Event()
         self.last_message_timestamp = 0
-
-        self.delay_rolling_average = 0
+        # Newest controller state for the display thread. Only the receive
+        # thread writes it, with a single attribute store, so no lock.
+        self._latest = None
+        # Last (steer, throttle) duty pair sent to the motors
+        self._last_controls = None
+        # Local receive time of the newest accepted frame, None before any
+        # frame or after the motors were stopped for a lost link
+        self._last_frame_time = None
+        self.display_thread = None
+
+        # The display is a full-screen redraw, pointless when stdout is
+        # piped to a file or journald
+        self.display_enabled = sys.stdout.isatty()
+        # Headless runs log every motor command change instead
+        self._controls_log_level = (
+            logging.DEBUG if self.display_enabled else logging.INFO)
+
+        self.delay_rolling_average = 0.0
         self.total_packets = 0
 
         # Initialize motor controller
@@ -28,28 +112,71 @@ class XboxControllerClient:
 
         # Create UDP socket
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.settimeout(1.0)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF,
+                                 RECV_BUFFER_SIZE)
+        except OSError as e:
+            print(f"Could not set receive buffer size: {e}")
 
         # Bind to specified port
         self.sock.bind(('0.0.0.0', self.client_port))
+        self.sock.setblocking(False)
+        self.receiver = BatchReceiver(self.sock)
+
+        # Wait for readiness instead of polling with a socket timeout
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.sock, selectors.EVENT_READ)
 
         print(f"Client started on port {self.client_port}")
         print(f"Waiting for data from server at {server_ip}:{server_port}")
 
     def receive_controller_data(self):
         """Receive and display controller data"""
+        if self.realtime:
+            enable_realtime(self.cpu)
+
         try:
             while self.running:
                 try:
-                    data, addr = self.sock.recvfrom(4096)
-                    controller_data = json.loads(data.decode('utf-8'))
-
-                    # Display the data
-                    self.display_controller_data(controller_data)
-
-                except socket.timeout:
-                    continue
-                except json.JSONDecodeError as e:
+                    if not self.selector.select(timeout=0.25):
+                        self._check_link()
+                        continue
+
+                    # Drain everything queued, only the newest frame matters.
+                    # Timestamps are read from the header, so stale frames are
+                    # never parsed.
+                    latest = None
+                    latest_timestamp = self.last_message_timestamp
+                    while True:
+                        packets = self.receiver.receive()
+                        if not packets:
+                            break
+                        for packet in packets:
+                            # A truncated or stray datagram must not displace
+                            # a valid frame from the same batch, so shorter
+                            # ones than their type needs are dropped
+                            size = len(packet)
+                            if (size < HEADER.size or
+                                    size < MIN_PACKET_SIZE.get(packet[0], 0)):
+                                logger.debug("Dropping %d byte datagram", size)
+                                continue
+                            _, timestamp = HEADER.unpack_from(packet, 0)
+                            if timestamp >= latest_timestamp:
+                                latest_timestamp = timestamp
+                                latest = packet
+                        if latest is not None:
+                            # Receive buffers are reused by the next call
+                            latest = bytes(latest)
+
+                    if latest is None:
+                        self._check_link()
+                        continue
+                    state = self.decode_packet(latest)
+                    if state is not None:
+                        self.handle_controller_state(state)
+
+                except ValueError as e:
+                    # Decode errors of all three JSON parsers are ValueErrors
                     print(f"Error decoding JSON: {e}")
                 except Exception as e:
                     print(f"Error receiving data: {e}")
@@ -61,79 +188,191 @@ class XboxControllerClient:
         finally:
             self.stop()
 
-    def display_controller_data(self, data):
-        """Display controller data in a formatted way"""
-        # Clear screen (works on most terminals)
-        print("\033[2J\033[H", end="")
+    def _check_link(self):
+        """Stop the motors once no frame has arrived for LINK_TIMEOUT"""
+        last = self._last_frame_time
+        if last is None or time.monotonic() - last < LINK_TIMEOUT:
+            return
 
-        timestamp = data.get('timestamp')
+        print(f"No data from server for {LINK_TIMEOUT:.1f}s, stopping motors")
+        self.motor_controller.stop()
+        # Forget the last command so the first frame after recovery is applied
+        self._last_controls = None
+        self._last_frame_time = None
 
-        # delay = timestamp - time.time()
-        # self.delay_rolling_average = (self.delay_rolling_average * (self.total_packets) + delay )/(self.total_packets+1)
-        # self.total_packets += 1
-        # print(self.delay_rolling_average)
+    def decode_packet(self, packet):
+        """
+        Decode a datagram into a controller state tuple.
 
-        if timestamp < self.last_message_timestamp:
-            return
-        self.last_message_timestamp = timestamp
+        Returns:
+            tuple: (timestamp, left_x, left_y, right_x, right_y, left_trigger,
+                right_trigger, button_bits), or None if the packet carries no
+                controller state.
+        """
+        packet_type = packet[0]
 
-        controller_data = data.get('controller_data', {})
+        if packet_type == PACKET_STATE:
+            return STATE_FRAME.unpack_from(packet, 0)[1:]
 
-        print("=" * 60)
-        print(f"Xbox Controller State")
-        print("=" * 60)
+        if packet_type == PACKET_JSON:
+            return self._state_from_json(
+                json_loads(memoryview(packet)[HEADER.size:]))
 
-        # Display sticks
-        left_stick = controller_data.get('left_stick', {})
-        right_stick = controller_data.get('right_stick', {})
+        print(f"Ignoring packet of unknown type {packet_type}")
+        return None
 
-        print(
-            f"Left Stick:  X={left_stick.get('x', 0):6.3f} Y={left_stick.get('y', 0):6.3f}")
-        if left_stick.get('x', 0) > 0:
-            self.motor_controller.right(left_stick.get('x', 0) * 100)
-        else:
-            self.motor_controller.left(left_stick.get('x', 0) * 100 * -1)
+    def _state_from_json(self, data):
+        """Convert JSON controller data into a controller state tuple"""
+        # The schema is fixed, so unpack it once instead of defaulted .get()s
+        try:
+            controller_data = data['controller_data']
+            left_stick = controller_data['left_stick']
+            right_stick = controller_data['right_stick']
+            triggers = controller_data['triggers']
+            buttons = controller_data['buttons']
+            button_bits = 0
+            for i, name in enumerate(BUTTON_NAMES):
+                if buttons.get(name):
+                    button_bits |= 1 << i
+            return (data['timestamp'],
+                    left_stick['x'], left_stick['y'],
+                    right_stick['x'], right_stick['y'],
+                    triggers['left'], triggers['right'], button_bits)
+        except (KeyError, TypeError) as e:
+            print(f"Ignoring JSON packet without controller data: {e}")
+            return None
+
+    def handle_controller_state(self, state):
+        """Drive the motors from a controller state and publish it for display"""
+        timestamp = state[0]
 
-        print(
-            f"Right Stick: X={right_stick.get('x', 0):6.3f} Y={right_stick.get('y', 0):6.3f}")
+        if timestamp < self.last_message_timestamp:
+            return
+        self.last_message_timestamp = timestamp
+        self._last_frame_time = time.monotonic()
+
+        # Running mean of the one-way delay, only meaningful when the server
+        # and client clocks are synchronized (e.g. NTP)
+        self.total_packets += 1
+        self.delay_rolling_average += (
+            (time.time() - timestamp - self.delay_rolling_average)
+            / self.total_packets)
+
+        # Motor commands are issued for every frame
+        self.apply_controls(state[1], state[5], state[6])
+
+        # Terminal redraws happen on the display thread
+        self._latest = state
+
+    def _display_loop(self):
+        """Redraw the newest controller state at a fixed rate"""
+        drawn = None
+        while self.running:
+            time.sleep(DISPLAY_INTERVAL)
+            state = self._latest
+            if state is not None and state is not drawn:
+                self.display_controller_data(state)
+                drawn = state
+
+    def apply_controls(self, left_x, left_trigger, right_trigger):
+        """
+        Drive the motors from the controller inputs.
+
+        Args:
+            left_x (float): Left stick X, steers right when positive.
+            left_trigger (float): Backward throttle from 0.0 to 1.0.
+            right_trigger (float): Forward throttle from 0.0 to 1.0.
+        """
+        # Whole percent steering, the duty resolution of the motor driver
+        steer = int(round(left_x * 100))
+
+        # One signed throttle: right trigger forward, left trigger backward
+        throttle = (self._trigger_duty(right_trigger)
+                    - self._trigger_duty(left_trigger))
+
+        # Each frame steers and then throttles, so the motor controller's
+        # own caches always see a change. Skip both when neither moved.
+        controls = (steer, throttle)
+        if controls == self._last_controls:
+            return
+        self._last_controls = controls
 
-        # Display triggers
-        triggers = controller_data.get('triggers', {})
-        print(
-            f"Triggers:    L={triggers.get('left', 0):6.3f} R={triggers.get('right', 0):6.3f}")
-        right_trigger_mag = triggers.get('right', 0) * 100
-        left_trigger_mag = triggers.get('left', 0) * 100
+        logger.log(self._controls_log_level,
+                   "Steer %s, throttle %s", steer, throttle)
 
-        print("RIGHT TRIGGER", right_trigger_mag)
-        print("LEFT TRIGGER", left_trigger_mag)
+        if steer > 0:
+            self.motor_controller.right(steer)
+        else:
+            self.motor_controller.left(-steer)
 
-        if right_trigger_mag > 0:
-            self.motor_controller.forward(right_trigger_mag)
+        if throttle > 0:
+            self.motor_controller.forward(throttle)
         else:
-            self.motor_controller.backward(left_trigger_mag)
+            self.motor_controller.backward(-throttle)
+
+    @staticmethod
+    def _trigger_duty(value):
+        """Convert a trigger value to a duty cycle in THROTTLE_STEP steps"""
+        if value < TRIGGER_DEADZONE:
+            return 0
+        return int(value * (100 // THROTTLE_STEP)) * THROTTLE_STEP
+
+    def display_controller_data(self, state):
+        """Display a controller state tuple in a formatted way"""
+        (_, left_x, left_y, right_x, right_y,
+         left_trigger, right_trigger, button_bits) = state
 
-        buttons = controller_data.get('buttons', {})
-        print(buttons)
+        buttons = {name: bool(button_bits & (1 << i))
+                   for i, name in enumerate(BUTTON_NAMES)}
 
-        print("\n" + "=" * 60)
+        # Build the whole frame with one format call and write it at once
+        sys.stdout.write(_format_frame(
+            left_x, left_y, right_x, right_y, left_trigger, right_trigger,
+            buttons, self.delay_rolling_average * 1000, self.total_packets))
+        sys.stdout.flush()
 
     def start(self):
         """Start the client"""
         self.running = True
         print("Receiving controller data...")
 
-        self.receive_controller_data()
+        if self.realtime:
+            reduce_switch_interval()
 
-        try:
-            while self.running:
-                time.sleep(0.1)
-        except KeyboardInterrupt:
-            print("\nStopping client...")
-            self.stop()
+        self.receive_thread = threading.Thread(
+            target=self.receive_controller_data, daemon=True)
+        self.receive_thread.start()
+        if self.display_enabled:
+            self.display_thread = threading.Thread(
+                target=self._display_loop, daemon=True)
+            self.display_thread.start()
+        else:
+            print("stdout is not a terminal, controller display disabled, "
+                  "logging motor command changes instead")
+
+        # Sleep until stop() is requested, Ctrl+C sets the event too
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self._handle_signal)
+        self._stop_event.wait()
+        self.stop()
+
+    def _handle_signal(self, signum, frame):
+        """Wake the main thread to shut down"""
+        print("\nStopping client...")
+        self._stop_event.set()
 
     def stop(self):
         """Stop the client"""
         self.running = False
+        self._stop_event.set()
+
+        # Let the receive loop notice before its socket goes away
+        for thread in (self.receive_thread, self.display_thread):
+            if thread and thread is not threading.current_thread():
+                thread.join(timeout=1.0)
+
+        if hasattr(self, 'selector'):
+            self.selector.close()
         if hasattr(self, 'sock'):
             self.sock.close()
         if hasattr(self, 'motor_controller'):
@@ -142,8 +381,6 @@ class XboxControllerClient:
 
 def main():
     """Main function"""
-    import argparse
-
     parser = argparse.ArgumentParser(description='Xbox Controller Client')
     parser.add_argument('--server-ip', default='10.0.0.131',
                         help='Server IP address (default: 127.0.0.1)')
@@ -151,12 +388,23 @@ def main():
                         default=5000, help='Server port (default: 5000)')
     parser.add_argument('--client-port', type=int,
                         default=5001, help='Client port (default: 5001)')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Enable per-frame debug logging')
+    parser.add_argument('--realtime', action='store_true',
+                        help='Run the receive thread with SCHED_FIFO priority '
+                             '(needs root or CAP_SYS_NICE)')
+    parser.add_argument('--cpu', type=int, default=None,
+                        help='CPU to pin the receive thread to with --realtime')
 
     args = parser.parse_args()
 
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO)
+
     try:
         client = XboxControllerClient(
-            args.server_ip, args.server_port, args.client_port)
+            args.server_ip, args.server_port, args.client_port,
+            cpu=args.cpu, realtime=args.realtime)
         client.start()
     except Exception as e:
         print(f"Error starting client: {e}")
@@ -5,15 +5,29 @@ Handles motor control using GPIO pins and PWM with proper cleanup.
 """
 
 import atexit
+import logging
 import signal
 import sys
 
+# pigpio (hardware PWM, multi-pin bank writes) is preferred when its daemon
+# is running, RPi.GPIO is the fallback
+try:
+    import pigpio
+    PIGPIO_AVAILABLE = True
+except ImportError:
+    PIGPIO_AVAILABLE = False
+
 try:
     import RPi.GPIO as GPIO
     GPIO_AVAILABLE = True
 except ImportError:
     GPIO_AVAILABLE = False
-    print("Warning: RPi.GPIO not available. Motor control will be simulated.")
+
+if not PIGPIO_AVAILABLE and not GPIO_AVAILABLE:
+    print("Warning: pigpio and RPi.GPIO not available. "
+          "Motor control will be simulated.")
+
+logger = logging.getLogger(__name__)
 
 
 class MotorController:
@@ -36,13 +50,41 @@ class MotorController:
         self.RIGHT_FORWARD = 26
         self.RIGHT_ENABLE = 19
 
-        # PWM objects
+        # PWM frequency of the enable pins in Hz
+        self.PWM_FREQUENCY = 100
+
+        # pigpio connection, None when using RPi.GPIO
+        self.pi = None
+
+        # RPi.GPIO PWM objects
         self.pwm_left = None
         self.pwm_right = None
 
+        # Direction pins, and for each direction tag whether the left and
+        # right motors spin forward
+        self._dir_pins = (self.LEFT_FORWARD, self.LEFT_BACKWARD,
+                          self.RIGHT_FORWARD, self.RIGHT_BACKWARD)
+        self._directions = {
+            'F': (True, True),
+            'B': (False, False),
+            'R': (True, False),
+            'L': (False, True),
+        }
+
+        # Per-direction pin writes, precomputed once the backend is known
+        self._dir_writes = {}
+
         # Track if GPIO is initialized
         self._initialized = False
 
+        # Last values written to the pins, so unchanged writes are skipped
+        self._last_dir = None
+        self._last_lspeed = -1
+        self._last_rspeed = -1
+
+        # PWM starts at a duty cycle of 0, so the motors start stopped
+        self._is_stopped = True
+
         # Initialize GPIO
         self._setup_gpio()
 
@@ -53,6 +95,9 @@ class MotorController:
 
     def _setup_gpio(self):
         """Set up GPIO pins and PWM"""
+        if PIGPIO_AVAILABLE and self._setup_pigpio():
+            return
+
         if not GPIO_AVAILABLE:
             return
 
@@ -70,13 +115,14 @@ class MotorController:
 
             # Create PWM objects for the enable pins to control motor speed
             # A frequency of 100 Hz is a good starting point
-            self.pwm_left = GPIO.PWM(self.LEFT_ENABLE, 100)
-            self.pwm_right = GPIO.PWM(self.RIGHT_ENABLE, 100)
+            self.pwm_left = GPIO.PWM(self.LEFT_ENABLE, self.PWM_FREQUENCY)
+            self.pwm_right = GPIO.PWM(self.RIGHT_ENABLE, self.PWM_FREQUENCY)
 
             # Start the PWM with a duty cycle of 0 (motor is off initially)
             self.pwm_left.start(0)
             self.pwm_right.start(0)
 
+            self._precompute_directions()
             self._initialized = True
             print("Motor controller initialized successfully")
 
@@ -85,6 +131,57 @@ class MotorController:
             self.cleanup()
             raise
 
+    def _setup_pigpio(self):
+        """Set up GPIO pins and PWM through the pigpio daemon"""
+        pi = pigpio.pi()
+        if not pi.connected:
+            print("pigpio daemon not running, falling back to RPi.GPIO")
+            return False
+
+        try:
+            for pin in (self.LEFT_BACKWARD, self.LEFT_FORWARD,
+                        self.RIGHT_BACKWARD, self.RIGHT_FORWARD):
+                pi.set_mode(pin, pigpio.OUTPUT)
+
+            # GPIO 18 and 19 are the SoC's two hardware PWM channels, so the
+            # waveform needs no CPU or DMA at all. Duty is 0-1,000,000.
+            for pin in (self.LEFT_ENABLE, self.RIGHT_ENABLE):
+                pi.hardware_PWM(pin, self.PWM_FREQUENCY, 0)
+
+            self.pi = pi
+            self._precompute_directions()
+            self._initialized = True
+            print("Motor controller initialized successfully (pigpio)")
+            return True
+
+        except Exception as e:
+            print(f"Error initializing motor controller: {e}")
+            pi.stop()
+            raise
+
+    def _precompute_directions(self):
+        """
+        Build the pin writes for every direction tag.
+
+        pigpio gets a (set mask, clear mask) pair for the bank writes,
+        RPi.GPIO gets the pin levels for one multi-channel output() call.
+        """
+        for direction, (left_forward, right_forward) in \
+                self._directions.items():
+            levels = (left_forward, not left_forward,
+                      right_forward, not right_forward)
+            if self.pi is not None:
+                high = low = 0
+                for pin, on in zip(self._dir_pins, levels):
+                    if on:
+                        high |= 1 << pin
+                    else:
+                        low |= 1 << pin
+                self._dir_writes[direction] = (high, low)
+            else:
+                self._dir_writes[direction] = tuple(
+                    GPIO.HIGH if on else GPIO.LOW for on in levels)
+
     def forward(self, speed=100):
         """
         Drives the motor in the forward direction.
@@ -92,19 +189,14 @@ class MotorController:
         Args:
             speed (int): The PWM duty cycle from 0 to 100.
         """
-        if not self._initialized or not GPIO_AVAILABLE:
-            print("Motor controller not initialized")
+        if not self._initialized:
+            logger.debug("Motor controller not initialized")
             return
 
-        print("Moving motor forward...")
-        GPIO.output(self.LEFT_BACKWARD, GPIO.LOW)
-        GPIO.output(self.LEFT_FORWARD, GPIO.HIGH)
-
-        GPIO.output(self.RIGHT_BACKWARD, GPIO.LOW)
-        GPIO.output(self.RIGHT_FORWARD, GPIO.HIGH)
-
-        self.pwm_left.ChangeDutyCycle(speed)
-        self.pwm_right.ChangeDutyCycle(speed)
+        logger.debug("Moving motor forward...")
+        self._is_stopped = False
+        self._set_direction('F')
+        self._set_speed(speed)
 
     def backward(self, speed=100):
         """
@@ -113,19 +205,14 @@ class MotorController:
         Args:
             speed (int): The PWM duty cycle from 0 to 100.
         """
-        if not self._initialized or not GPIO_AVAILABLE:
-            print("Motor controller not initialized")
+        if not self._initialized:
+            logger.debug("Motor controller not initialized")
             return
 
-        print("Moving motor backward...")
-        GPIO.output(self.LEFT_BACKWARD, GPIO.HIGH)
-        GPIO.output(self.LEFT_FORWARD, GPIO.LOW)
-
-        GPIO.output(self.RIGHT_BACKWARD, GPIO.HIGH)
-        GPIO.output(self.RIGHT_FORWARD, GPIO.LOW)
-
-        self.pwm_left.ChangeDutyCycle(speed)
-        self.pwm_right.ChangeDutyCycle(speed)
+        logger.debug("Moving motor backward...")
+        self._is_stopped = False
+        self._set_direction('B')
+        self._set_speed(speed)
 
     def right(self, speed=100):
         """
@@ -134,19 +221,14 @@ class MotorController:
         Args:
             speed (int): The PWM duty cycle from 0 to 100.
         """
-        if not self._initialized or not GPIO_AVAILABLE:
-            print("Motor controller not initialized")
+        if not self._initialized:
+            logger.debug("Motor controller not initialized")
             return
 
-        print("Moving motor right...")
-        GPIO.output(self.LEFT_BACKWARD, GPIO.LOW)
-        GPIO.output(self.LEFT_FORWARD, GPIO.HIGH)
-
-        GPIO.output(self.RIGHT_BACKWARD, GPIO.HIGH)
-        GPIO.output(self.RIGHT_FORWARD, GPIO.LOW)
-
-        self.pwm_left.ChangeDutyCycle(speed)
-        self.pwm_right.ChangeDutyCycle(speed)
+        logger.debug("Moving motor right...")
+        self._is_stopped = False
+        self._set_direction('R')
+        self._set_speed(speed)
 
     def left(self, speed=100):
         """
@@ -155,30 +237,66 @@ class MotorController:
         Args:
             speed (int): The PWM duty cycle from 0 to 100.
         """
-        if not self._initialized or not GPIO_AVAILABLE:
-            print("Motor controller not initialized")
+        if not self._initialized:
+            logger.debug("Motor controller not initialized")
             return
 
-        print("Moving motor left...")
-        GPIO.output(self.LEFT_BACKWARD, GPIO.HIGH)
-        GPIO.output(self.LEFT_FORWARD, GPIO.LOW)
+        logger.debug("Moving motor left...")
+        self._is_stopped = False
+        self._set_direction('L')
+        self._set_speed(speed)
 
-        GPIO.output(self.RIGHT_BACKWARD, GPIO.LOW)
-        GPIO.output(self.RIGHT_FORWARD, GPIO.HIGH)
+    def _set_direction(self, direction):
+        """
+        Set the direction pins of both motors.
+
+        Args:
+            direction (str): 'F', 'B', 'R' or 'L'. Writes are skipped when it
+                matches the last one.
+        """
+        if direction == self._last_dir:
+            return
 
-        self.pwm_left.ChangeDutyCycle(speed)
-        self.pwm_right.ChangeDutyCycle(speed)
+        if self.pi is not None:
+            # One bank write sets and one clears all four direction pins
+            high, low = self._dir_writes[direction]
+            self.pi.clear_bank_1(low)
+            self.pi.set_bank_1(high)
+        else:
+            GPIO.output(self._dir_pins, self._dir_writes[direction])
+
+        self._last_dir = direction
+
+    def _set_speed(self, speed):
+        """Set the duty cycle of both motors, skipping unchanged values"""
+        # Whole percent steps keep analog noise from forcing rewrites
+        duty = int(round(speed))
+
+        if duty != self._last_lspeed:
+            if self.pi is not None:
+                self.pi.hardware_PWM(self.LEFT_ENABLE, self.PWM_FREQUENCY,
+                                     duty * 10000)
+            else:
+                self.pwm_left.ChangeDutyCycle(duty)
+            self._last_lspeed = duty
+        if duty != self._last_rspeed:
+            if self.pi is not None:
+                self.pi.hardware_PWM(self.RIGHT_ENABLE, self.PWM_FREQUENCY,
+                                     duty * 10000)
+            else:
+                self.pwm_right.ChangeDutyCycle(duty)
+            self._last_rspeed = duty
 
     def stop(self):
         """
         Stops the motor by setting the enable pin to LOW.
         """
-        if not self._initialized or not GPIO_AVAILABLE:
+        if not self._initialized or self._is_stopped:
             return
 
-        print("Stopping motor...")
-        self.pwm_left.ChangeDutyCycle(0)
-        self.pwm_right.ChangeDutyCycle(0)
+        logger.debug("Stopping motor...")
+        self._set_speed(0)
+        self._is_stopped = True
 
     def _signal_handler(self, signum, frame):
         """Handle system signals for graceful shutdown"""
@@ -188,7 +306,7 @@ class MotorController:
 
     def cleanup(self):
         """Clean up GPIO resources"""
-        if not self._initialized or not GPIO_AVAILABLE:
+        if not self._initialized:
             return
 
         try:
@@ -197,16 +315,24 @@ class MotorController:
             # Stop motors
             self.stop()
 
-            # Stop PWM
-            if self.pwm_left:
-                self.pwm_left.stop()
-            if self.pwm_right:
-                self.pwm_right.stop()
+            if self.pi is not None:
+                # Release the daemon connection
+                self.pi.stop()
+                self.pi = None
+            else:
+                # Stop PWM
+                if self.pwm_left:
+                    self.pwm_left.stop()
+                if self.pwm_right:
+                    self.pwm_right.stop()
 
-            # Clean up GPIO
-            GPIO.cleanup()
+                # Clean up GPIO
+                GPIO.cleanup()
 
             self._initialized = False
+            self._last_dir = None
+            self._last_lspeed = -1
+            self._last_rspeed = -1
             print("Motor controller cleanup completed")
 
         except Exception as e:
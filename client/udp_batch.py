@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+UDP Batch Receiver Module
+Reads every queued datagram with a single recvmmsg() call on Linux.
+"""
+
+import ctypes
+import errno
+import os
+import socket
+import sys
+
+# Maximum number of datagrams read per recvmmsg() call
+BATCH_SIZE = 16
+
+# Size of each pre-allocated receive buffer
+BUFFER_SIZE = 4096
+
+MSG_DONTWAIT = getattr(socket, 'MSG_DONTWAIT', 0x40)
+
+
+class _IOVec(ctypes.Structure):
+    """struct iovec"""
+    _fields_ = [
+        ('iov_base', ctypes.c_void_p),
+        ('iov_len', ctypes.c_size_t),
+    ]
+
+
+class _MsgHdr(ctypes.Structure):
+    """struct msghdr"""
+    _fields_ = [
+        ('msg_name', ctypes.c_void_p),
+        ('msg_namelen', ctypes.c_uint32),
+        ('msg_iov', ctypes.POINTER(_IOVec)),
+        ('msg_iovlen', ctypes.c_size_t),
+        ('msg_control', ctypes.c_void_p),
+        ('msg_controllen', ctypes.c_size_t),
+        ('msg_flags', ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    """struct mmsghdr"""
+    _fields_ = [
+        ('msg_hdr', _MsgHdr),
+        ('msg_len', ctypes.c_uint),
+    ]
+
+
+def _load_recvmmsg():
+    """Return libc's recvmmsg() or None when it is not available"""
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        libc = ctypes.CDLL('libc.so.6', use_errno=True)
+        recvmmsg = libc.recvmmsg
+    except (OSError, AttributeError):
+        return None
+
+    recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr),
+                         ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+    recvmmsg.restype = ctypes.c_int
+    return recvmmsg
+
+
+_recvmmsg = _load_recvmmsg()
+
+
+class BatchReceiver:
+    """
+    Class to read all pending datagrams from a UDP socket at once.
+    Uses recvmmsg() where available and falls back to a single
+    recvfrom_into() a pre-allocated buffer.
+    """
+
+    def __init__(self, sock, batch_size=BATCH_SIZE, buffer_size=BUFFER_SIZE):
+        """Initialize the batch receiver for the given socket"""
+        self.sock = sock
+        self.batch_size = batch_size
+        self.buffer_size = buffer_size
+        self.use_recvmmsg = _recvmmsg is not None
+
+        if self.use_recvmmsg:
+            self._setup_headers()
+        else:
+            self._buffer = bytearray(buffer_size)
+            self._view = memoryview(self._buffer)
+
+    def _setup_headers(self):
+        """Pre-allocate the buffers and message headers reused for every read"""
+        self._buffers = [ctypes.create_string_buffer(self.buffer_size)
+                         for _ in range(self.batch_size)]
+        self._views = [memoryview(buf).cast('B') for buf in self._buffers]
+        self._iovecs = (_IOVec * self.batch_size)()
+        self._msgs = (_MMsgHdr * self.batch_size)()
+        for i, buf in enumerate(self._buffers):
+            self._iovecs[i].iov_base = ctypes.addressof(buf)
+            self._iovecs[i].iov_len = self.buffer_size
+            hdr = self._msgs[i].msg_hdr
+            hdr.msg_iov = ctypes.pointer(self._iovecs[i])
+            hdr.msg_iovlen = 1
+
+    def receive(self):
+        """
+        Read the datagrams currently queued on the socket without blocking.
+
+        Returns:
+            list: Received datagrams, oldest first, as memoryviews into
+                buffers that are reused by the next call.
+        """
+        if not self.use_recvmmsg:
+            try:
+                nbytes, _ = self.sock.recvfrom_into(self._buffer)
+            except BlockingIOError:
+                return []
+            return [self._view[:nbytes]]
+
+        count = _recvmmsg(self.sock.fileno(), self._msgs, self.batch_size,
+                          MSG_DONTWAIT, None)
+        if count < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return []
+            raise OSError(err, os.strerror(err))
+
+        msgs = self._msgs
+        views = self._views
+        return [views[i][:msgs[i].msg_len] for i in range(count)]
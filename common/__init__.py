@@ -0,0 +1,4 @@
+"""
+Common package for Xbox Controller Server
+Contains helpers shared by the client and server packages.
+"""
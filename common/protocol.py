@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Wire Protocol Module
+Datagram layout shared by the server (sender) and the client (receiver).
+"""
+
+import struct
+
+# Every datagram starts with the packet type (doubling as the protocol
+# version) and the sender timestamp, so receivers can drop stale packets
+# before decoding the rest.
+HEADER = struct.Struct('!Bd')
+
+# Packet types
+PACKET_JSON = 0   # header followed by a JSON body
+PACKET_STATE = 1  # header followed by the controller state below
+
+# Controller state frame: header, then left x/y, right x/y, left/right
+# trigger as float32 and the button bitmask (bit i = button i)
+STATE_FRAME = struct.Struct('!Bd6fH')
+
+# Shortest valid datagram of each packet type
+MIN_PACKET_SIZE = {PACKET_JSON: HEADER.size, PACKET_STATE: STATE_FRAME.size}
+
+# Button names in bitmask order, bit i is the controller's button i
+BUTTON_NAMES = ('A', 'B', 'X', 'Y', 'LB', 'RB', 'back', 'start', 'guide',
+                'left_stick_click', 'right_stick_click')
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Real-time Scheduling Module
+Optional CPU pinning, thread priority and GIL tuning behind --realtime.
+"""
+
+import os
+import sys
+
+# GIL switch interval with --realtime (default 5 ms), so the latency
+# critical thread gets the GIL back quickly from the other Python threads
+REALTIME_SWITCH_INTERVAL = 0.001
+
+
+def enable_realtime(cpu=None, priority=20):
+    """
+    Pin the calling thread to a CPU and give it real-time priority.
+
+    SCHED_FIFO needs root or CAP_SYS_NICE. Without it the thread is reniced
+    to -10 instead, if that is allowed. Both are Linux only.
+
+    Args:
+        cpu (int): CPU to pin the thread to, or None to leave it unpinned.
+        priority (int): SCHED_FIFO priority from 1 to 99.
+    """
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except OSError as e:
+            print(f"Could not pin thread to CPU {cpu}: {e}")
+
+    if not hasattr(os, 'sched_setscheduler'):
+        return
+
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+    except PermissionError:
+        try:
+            os.nice(-10)
+        except PermissionError:
+            print("No permission to raise thread priority "
+                  "(run as root or grant CAP_SYS_NICE)")
+
+
+def reduce_switch_interval():
+    """Lower the process-wide GIL switch interval for --realtime"""
+    sys.setswitchinterval(REALTIME_SWITCH_INTERVAL)
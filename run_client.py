@@ -3,14 +3,14 @@
 Launcher script for the Xbox Controller Client
 Run this script from the project root to start the client.
 """
+import argparse
+import logging
 import sys
 
 from client.client import XboxControllerClient
 
 if __name__ == "__main__":
     """Main function"""
-    import argparse
-
     parser = argparse.ArgumentParser(description='Xbox Controller Client')
     parser.add_argument('--server-ip', default='10.0.0.131',
                         help='Server IP address (default: 127.0.0.1)')
@@ -18,12 +18,23 @@ if __name__ == "__main__":
                         default=5000, help='Server port (default: 5000)')
     parser.add_argument('--client-port', type=int,
                         default=5001, help='Client port (default: 5001)')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Enable per-frame debug logging')
+    parser.add_argument('--realtime', action='store_true',
+                        help='Run the receive thread with SCHED_FIFO priority '
+                             '(needs root or CAP_SYS_NICE)')
+    parser.add_argument('--cpu', type=int, default=None,
+                        help='CPU to pin the receive thread to with --realtime')
 
     args = parser.parse_args()
 
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO)
+
     try:
         client = XboxControllerClient(
-            args.server_ip, args.server_port, args.client_port)
+            args.server_ip, args.server_port, args.client_port,
+            cpu=args.cpu, realtime=args.realtime)
         client.start()
     except Exception as e:
         print(f"Error starting client: {e}")
@@ -3,14 +3,14 @@
 Launcher script for the Xbox Controller Server
 Run this script from the project root to start the server.
 """
+import argparse
+import logging
 import sys
 
 from server.server import XboxControllerServer
 
 if __name__ == "__main__":
     """Main function"""
-    import argparse
-
     parser = argparse.ArgumentParser(description='Xbox Controller Server')
     parser.add_argument('--client-ip', default='10.0.0.36',
                         help='Client IP address (default: 10.0.0.36)')
@@ -18,14 +18,24 @@ if __name__ == "__main__":
                         default=5001, help='Client port (default: 5001)')
     parser.add_argument('--server-port', type=int,
                         default=5000, help='Server port (default: 5000)')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Enable per-frame debug logging')
+    parser.add_argument('--realtime', action='store_true',
+                        help='Run the send thread with SCHED_FIFO priority '
+                             '(needs root or CAP_SYS_NICE)')
+    parser.add_argument('--cpu', type=int, default=None,
+                        help='CPU to pin the send thread to with --realtime')
 
     args = parser.parse_args()
 
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING)
+
     try:
         server = XboxControllerServer(
-            args.client_ip, args.client_port, args.server_port)
+            args.client_ip, args.client_port, args.server_port,
+            cpu=args.cpu, realtime=args.realtime)
         server.start()
     except Exception as e:
         print(f"Error starting server: {e}")
-        import sys
         sys.exit(1)
@@ -8,24 +8,54 @@ import pygame
 import threading
 import time
 
+from common.protocol import BUTTON_NAMES
+
+# Axis values closer to rest than this are snapped to rest, so controller
+# jitter does not register as movement
+DEADZONE = 0.05
+
+# Controllers plugged in or out, reported by SDL without re-enumerating
+HOTPLUG_EVENTS = (pygame.JOYDEVICEADDED, pygame.JOYDEVICEREMOVED)
+
+# Events that mean the controller state may have changed
+JOYSTICK_EVENTS = [pygame.JOYAXISMOTION, pygame.JOYBUTTONDOWN,
+                   pygame.JOYBUTTONUP, *HOTPLUG_EVENTS]
+
+# State published while no controller is connected, so receivers stop
+REST_SNAPSHOT = (0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0)
+
+
+def _deadzone(value):
+    """Snap values within DEADZONE of zero to zero"""
+    return 0.0 if -DEADZONE < value < DEADZONE else value
+
+
+def buttons_from_bits(button_bits):
+    """Expand a button bitmask (bit i = button i) into a name to bool dict"""
+    return {name: bool(button_bits & (1 << index))
+            for index, name in enumerate(BUTTON_NAMES)}
+
 
 class ControllerInput:
     """
     Class to handle Xbox controller input reading.
-    Provides thread-safe controller state management.
+    Provides lock-free controller state snapshots.
     """
 
     def __init__(self):
         """Initialize the controller input system"""
         self.joystick = None
         self.running = False
-        self.controller_state = {
-            'left_stick': {'x': 0, 'y': 0},
-            'right_stick': {'x': 0, 'y': 0},
-            'triggers': {'left': 0, 'right': 0},
-            'buttons': {}
-        }
-        self.lock = threading.Lock()
+        # Latest state as an immutable tuple:
+        # (left_x, left_y, right_x, right_y, left_trigger, right_trigger,
+        #  button_bits). Only poll() writes it, directly or through
+        # _handle_hotplug(), on whichever single thread drives polling: the
+        # reader thread, or the caller's thread with start(threaded=False).
+        # A new tuple is published with one attribute store, which is atomic
+        # under the GIL, so other readers need no lock.
+        self._snapshot = REST_SNAPSHOT
+        # (button index, bit mask) for every mapped button on the joystick
+        self._button_map = []
         self.reader_thread = None
 
     def init_pygame(self):
@@ -34,29 +64,72 @@ class ControllerInput:
             pygame.init()
             pygame.joystick.init()
 
+            # Without a controller yet, poll() opens the first one plugged in
             if pygame.joystick.get_count() == 0:
-                raise Exception("No controllers found")
+                print("No controllers found, waiting for one to connect")
+            else:
+                self._open_joystick(0)
 
-            self.joystick = pygame.joystick.Joystick(0)
-            self.joystick.init()
-
-            print(f"Controller Name: {self.joystick.get_name()}")
-            print(f"Number of Axes: {self.joystick.get_numaxes()}")
-            print(f"Number of Buttons: {self.joystick.get_numbuttons()}")
+            # Only queue joystick input, so an empty queue means nothing moved
+            pygame.event.set_blocked(None)
+            pygame.event.set_allowed(JOYSTICK_EVENTS)
 
         except Exception as e:
             print(f"Error initializing pygame: {e}")
             raise
 
-    def start(self):
-        """Start reading controller input"""
+    def _open_joystick(self, device_index):
+        """Open a controller and bind its hot lookups for poll()"""
+        self.joystick = pygame.joystick.Joystick(device_index)
+        self.joystick.init()
+
+        # The button layout is fixed, so resolve the mapping once
+        self._button_map = [
+            (i, 1 << i) for i in range(self.joystick.get_numbuttons())
+            if self._get_button_name(i)]
+        self._get_axis = self.joystick.get_axis
+        self._get_button = self.joystick.get_button
+
+        print(f"Controller Name: {self.joystick.get_name()}")
+        print(f"Number of Axes: {self.joystick.get_numaxes()}")
+        print(f"Number of Buttons: {self.joystick.get_numbuttons()}")
+
+    def _handle_hotplug(self, event):
+        """Re-open the controller on reconnect, rest the state on removal"""
+        if event.type == pygame.JOYDEVICEADDED:
+            # SDL also reports the controllers present at start-up
+            if self.joystick is None:
+                print("Controller connected")
+                self._open_joystick(event.device_index)
+                self._dirty = True
+        elif (self.joystick is not None
+                and event.instance_id == self.joystick.get_instance_id()):
+            print("Controller disconnected, waiting for it to reconnect")
+            self.joystick.quit()
+            self.joystick = None
+            self._snapshot = REST_SNAPSHOT
+
+    def start(self, threaded=True):
+        """
+        Start reading controller input.
+
+        Args:
+            threaded (bool): Read on a background thread. When False the
+                caller drives reading by calling poll() itself.
+        """
         if self.running:
             return
 
+        self._get_events = pygame.event.get
+
+        # The first poll() reads the controller whether or not events came
+        self._dirty = True
+
         self.running = True
-        self.reader_thread = threading.Thread(
-            target=self._read_controller_loop, daemon=True)
-        self.reader_thread.start()
+        if threaded:
+            self.reader_thread = threading.Thread(
+                target=self._read_controller_loop, daemon=True)
+            self.reader_thread.start()
         print("Controller input reading started")
 
     def stop(self):
@@ -67,41 +140,58 @@ class ControllerInput:
         pygame.quit()
         print("Controller input reading stopped")
 
+    def poll(self):
+        """
+        Read the controller if it reported input and publish the new state.
+
+        Returns:
+            tuple: The current controller state snapshot, unchanged when no
+                joystick event arrived since the last poll.
+        """
+        # Draining the queue also pumps SDL. Without events the axes and
+        # buttons are unchanged, so skip reading them one by one.
+        events = self._get_events()
+        if not events and not self._dirty:
+            return self._snapshot
+
+        for event in events:
+            if event.type in HOTPLUG_EVENTS:
+                self._handle_hotplug(event)
+        if self.joystick is None:
+            return self._snapshot
+        self._dirty = False
+
+        get_axis = self._get_axis
+        get_button = self._get_button
+
+        # Read analog sticks. Values go out as float32, so there is no point
+        # rounding them here.
+        left_stick_x = _deadzone(get_axis(0))
+        left_stick_y = _deadzone(get_axis(1))
+        right_stick_x = _deadzone(get_axis(2))
+        right_stick_y = _deadzone(get_axis(3))
+
+        # Read triggers (convert from -1,1 to 0,1 range)
+        left_trigger = _deadzone((get_axis(4) + 1) * 0.5)
+        right_trigger = _deadzone((get_axis(5) + 1) * 0.5)
+
+        # Read buttons into a bitmask
+        button_bits = 0
+        for index, mask in self._button_map:
+            if get_button(index):
+                button_bits |= mask
+
+        # Publish the new state
+        snapshot = (left_stick_x, left_stick_y, right_stick_x, right_stick_y,
+                    left_trigger, right_trigger, button_bits)
+        self._snapshot = snapshot
+        return snapshot
+
     def _read_controller_loop(self):
         """Read controller input in a loop"""
         try:
             while self.running:
-                pygame.event.pump()
-
-                # Read analog sticks
-                left_stick_x = round(self.joystick.get_axis(0), 3)
-                left_stick_y = round(self.joystick.get_axis(1), 3)
-                right_stick_x = round(self.joystick.get_axis(2), 3)
-                right_stick_y = round(self.joystick.get_axis(3), 3)
-
-                # Read triggers (convert from -1,1 to 0,1 range)
-                left_trigger = round((self.joystick.get_axis(4) + 1) / 2, 3)
-                right_trigger = round((self.joystick.get_axis(5) + 1) / 2, 3)
-
-                # Read buttons
-                buttons = {}
-                for i in range(self.joystick.get_numbuttons()):
-                    button_name = self._get_button_name(i)
-                    if button_name:
-                        buttons[button_name] = bool(
-                            self.joystick.get_button(i))
-
-                # Create new controller state
-                new_controller_state = {
-                    'left_stick': {'x': left_stick_x, 'y': left_stick_y},
-                    'right_stick': {'x': right_stick_x, 'y': right_stick_y},
-                    'triggers': {'left': left_trigger, 'right': right_trigger},
-                    'buttons': buttons
-                }
-
-                # Update shared state safely
-                with self.lock:
-                    self.controller_state = new_controller_state
+                self.poll()
 
                 # Small sleep to prevent excessive CPU usage
                 time.sleep(0.01)
@@ -113,25 +203,24 @@ class ControllerInput:
 
     def _get_button_name(self, button_index):
         """Map button index to button name"""
-        button_names = {
-            0: 'A',
-            1: 'B',
-            2: 'X',
-            3: 'Y',
-            4: 'LB',
-            5: 'RB',
-            6: 'back',
-            7: 'start',
-            8: 'guide',
-            9: 'left_stick_click',
-            10: 'right_stick_click'
-        }
-        return button_names.get(button_index)
+        if button_index < len(BUTTON_NAMES):
+            return BUTTON_NAMES[button_index]
+        return None
+
+    def get_snapshot(self):
+        """Get the current controller state as an immutable tuple"""
+        return self._snapshot
 
     def get_controller_state(self):
-        """Get a copy of the current controller state"""
-        with self.lock:
-            return self.controller_state.copy()
+        """Get the current controller state as a dict"""
+        (left_x, left_y, right_x, right_y,
+         left_trigger, right_trigger, button_bits) = self._snapshot
+        return {
+            'left_stick': {'x': left_x, 'y': left_y},
+            'right_stick': {'x': right_x, 'y': right_y},
+            'triggers': {'left': left_trigger, 'right': right_trigger},
+            'buttons': buttons_from_bits(button_bits)
+        }
 
     def is_connected(self):
         """Check if controller is connected"""
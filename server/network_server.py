@@ -4,11 +4,45 @@ Network Server Module
 Handles UDP communication with clients.
 """
 
-import json
 import socket
-import threading
 import time
 
+try:
+    from orjson import dumps as json_dumps
+except ImportError:
+    import json
+
+    def json_dumps(data):
+        """Fallback serializer returning UTF-8 bytes like orjson"""
+        return json.dumps(data).encode('utf-8')
+
+from common.protocol import HEADER, PACKET_JSON, PACKET_STATE, STATE_FRAME
+
+# IPTOS_LOWDELAY, asks the network to favour latency for controller frames
+IP_TOS_LOWDELAY = 0x10
+
+# Queueing priority for the local traffic control layer. 6 is the highest
+# priority that does not need CAP_NET_ADMIN (Linux only)
+SOCKET_PRIORITY = 6
+
+
+def write_json_frame(buffer, timestamp, body):
+    """
+    Write a JSON datagram into a pre-allocated buffer.
+
+    Args:
+        buffer (bytearray): Destination buffer, large enough for the frame.
+        timestamp (float): Sender timestamp stored in the header.
+        body (bytes): Already serialized JSON body.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    HEADER.pack_into(buffer, 0, PACKET_JSON, timestamp)
+    size = HEADER.size + len(body)
+    buffer[HEADER.size:size] = body
+    return size
+
 
 class NetworkServer:
     """
@@ -23,7 +57,14 @@ class NetworkServer:
         self.server_port = server_port
         self.running = False
         self.sock = None
-        self.sender_thread = None
+
+        # Reused by send_json() so direct sends allocate no datagram bytes
+        self._sendbuf = bytearray(4096)
+        self._sendview = memoryview(self._sendbuf)
+
+        # Reused by send_state(), every state frame has the same size
+        self._statebuf = bytearray(STATE_FRAME.size)
+        self._stateview = memoryview(self._statebuf)
 
     def start(self):
         """Start the network server"""
@@ -34,12 +75,14 @@ class NetworkServer:
             # Initialize UDP socket
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._set_priority()
             self.sock.bind(('0.0.0.0', self.server_port))
 
+            # There is only one client, so pin it once and let the kernel
+            # skip the per-datagram destination lookup
+            self.sock.connect((self.client_ip, self.client_port))
+
             self.running = True
-            self.sender_thread = threading.Thread(
-                target=self._send_loop, daemon=True)
-            self.sender_thread.start()
 
             print(f"Network server started on port {self.server_port}")
             print(
@@ -49,32 +92,77 @@ class NetworkServer:
             print(f"Error starting network server: {e}")
             raise
 
+    def _set_priority(self):
+        """Mark outgoing datagrams as low-delay where the platform allows"""
+        options = [(socket.IPPROTO_IP, getattr(socket, 'IP_TOS', None),
+                    IP_TOS_LOWDELAY),
+                   (socket.SOL_SOCKET, getattr(socket, 'SO_PRIORITY', None),
+                    SOCKET_PRIORITY)]
+        for level, option, value in options:
+            if option is None:
+                continue
+            try:
+                self.sock.setsockopt(level, option, value)
+            except OSError as e:
+                print(f"Could not set socket option {option}: {e}")
+
     def stop(self):
         """Stop the network server"""
         self.running = False
 
-        if self.sender_thread:
-            self.sender_thread.join(timeout=1.0)
-
         if self.sock:
             self.sock.close()
             self.sock = None
 
         print("Network server stopped")
 
-    def _send_loop(self):
-        """Send data loop - this will be overridden by the main server"""
-        pass
+    def send_state(self, timestamp, snapshot):
+        """
+        Pack a controller state frame and send it to the client right away.
+
+        Args:
+            timestamp (float): Time the snapshot was taken.
+            snapshot (tuple): Sticks, triggers and button bitmask as returned
+                by ControllerInput.poll().
+        """
+        if not self.running or not self.sock:
+            return False
+
+        try:
+            STATE_FRAME.pack_into(
+                self._statebuf, 0, PACKET_STATE, timestamp, *snapshot)
+            self.sock.send(self._stateview)
+            return True
+        except ConnectionRefusedError:
+            # Reported for an earlier datagram when no client is listening
+            return False
+        except Exception as e:
+            print(f"Error sending to {self.client_ip}:{self.client_port}: {e}")
+            return False
 
     def send_data(self, data):
-        """Send data to the client"""
+        """Serialize data to JSON and send it to the client"""
+        timestamp = data.get('timestamp')
+        if timestamp is None:
+            timestamp = time.time()
+        return self.send_json(timestamp, json_dumps(data))
+
+    def send_json(self, timestamp, body):
+        """Send a serialized JSON body to the client right away"""
         if not self.running or not self.sock:
             return False
 
         try:
-            message = json.dumps(data).encode('utf-8')
-            self.sock.sendto(message, (self.client_ip, self.client_port))
+            if HEADER.size + len(body) <= len(self._sendbuf):
+                size = write_json_frame(self._sendbuf, timestamp, body)
+                self.sock.send(self._sendview[:size])
+            else:
+                # Too big for the reused buffer, build this one datagram
+                self.sock.send(HEADER.pack(PACKET_JSON, timestamp) + body)
             return True
+        except ConnectionRefusedError:
+            # Reported for an earlier datagram when no client is listening
+            return False
         except Exception as e:
             print(f"Error sending to {self.client_ip}:{self.client_port}: {e}")
             return False
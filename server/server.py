@@ -4,24 +4,41 @@ Xbox Controller Server
 Main server module that combines controller input and network communication.
 """
 
+import logging
+import signal
 import time
 import threading
 
+from common.realtime import enable_realtime
+
 from .controller_input import ControllerInput
 from .network_server import NetworkServer
 
+logger = logging.getLogger(__name__)
+
+# Axis changes smaller than this do not count as a new controller state
+AXIS_EPSILON = 0.01
+
+# Unchanged state is still re-sent this often so the client sees the link
+KEEPALIVE_INTERVAL = 0.2
+
 
 class XboxControllerServer:
     """
     Main Xbox controller server that reads controller input and sends it to clients.
     """
 
-    def __init__(self, client_ip, client_port, server_port):
+    def __init__(self, client_ip, client_port, server_port,
+                 cpu=None, realtime=False):
         """Initialize the Xbox controller server"""
         self.client_ip = client_ip
         self.client_port = client_port
         self.server_port = server_port
+        self.cpu = cpu
+        self.realtime = realtime
         self.running = False
+        self.sender_thread = None
+        self._stop_event = threading.Event()
 
         # Initialize components
         self.controller_input = ControllerInput()
@@ -34,38 +51,45 @@ class XboxControllerServer:
             return
 
         try:
-            # Initialize controller input
+            # Initialize controller input. The send loop polls the controller
+            # itself right before each send, so there is no reader thread.
             self.controller_input.init_pygame()
-            self.controller_input.start()
+            self.controller_input.start(threaded=False)
 
             # Start network server
             self.network_server.start()
 
-            # Override the send loop to send controller data
-            self.network_server._send_loop = self._send_controller_data_loop
-            self.network_server.sender_thread = threading.Thread(
+            # One paced thread reads, packs and sends controller data
+            self.running = True
+            self.sender_thread = threading.Thread(
                 target=self._send_controller_data_loop, daemon=True)
-            self.network_server.sender_thread.start()
+            self.sender_thread.start()
 
-            self.running = True
             print("Xbox Controller Server started successfully")
 
-            # Keep the main thread alive
-            try:
-                while self.running:
-                    time.sleep(0.1)
-            except KeyboardInterrupt:
-                print("\nShutting down server...")
-                self.stop()
+            # Sleep until stop() is requested, Ctrl+C sets the event too
+            if threading.current_thread() is threading.main_thread():
+                signal.signal(signal.SIGINT, self._handle_signal)
+            self._stop_event.wait()
+            self.stop()
 
         except Exception as e:
             print(f"Error starting server: {e}")
             self.stop()
             raise
 
+    def _handle_signal(self, signum, frame):
+        """Wake the main thread to shut down"""
+        print("\nShutting down server...")
+        self._stop_event.set()
+
     def stop(self):
         """Stop the server"""
         self.running = False
+        self._stop_event.set()
+
+        if self.sender_thread:
+            self.sender_thread.join(timeout=1.0)
 
         # Stop components
         if hasattr(self, 'controller_input'):
@@ -80,29 +104,65 @@ class XboxControllerServer:
         """Send controller data to clients at 60 FPS"""
         try:
             print("Sending controller data loop started")
-            while self.running:
-                print("Sending controller data loop running")
-                # Get current controller state
-                controller_state = self.controller_input.get_controller_state()
 
-                # Prepare data for transmission
-                data = {
-                    'timestamp': time.time(),
-                    'controller_data': controller_state
-                }
+            if self.realtime:
+                enable_realtime(self.cpu)
 
-                print(data)
+            poll = self.controller_input.poll
+            send_state = self.network_server.send_state
 
-                # Send to client
-                self.network_server.send_data(data)
+            # Sleep to absolute deadlines so work time does not add drift
+            period = 1 / 60
+            next_tick = time.perf_counter() + period
+
+            frame = 0
+            last_snapshot = None
+            last_send_ts = 0.0
+            while self.running:
+                snapshot = poll()
+                timestamp = time.time()
+
+                # Only send changes, plus a keepalive when nothing moves.
+                # poll() returns the same tuple when no input arrived, so
+                # idle frames skip the comparison.
+                if (last_snapshot is None
+                        or timestamp - last_send_ts >= KEEPALIVE_INTERVAL
+                        or (snapshot is not last_snapshot
+                            and self._state_changed(last_snapshot, snapshot))):
+                    # Pack and send on this thread, no hand-off
+                    send_state(timestamp, snapshot)
+                    last_snapshot = snapshot
+                    last_send_ts = timestamp
+
+                # Log roughly once per second rather than every frame
+                frame += 1
+                if frame % 60 == 0:
+                    logger.debug("Frame %d: %s", frame, snapshot)
 
                 # Control update rate (60 FPS)
-                time.sleep(1/60)
+                slack = next_tick - time.perf_counter()
+                if slack > 0:
+                    time.sleep(slack)
+                next_tick += period
+
+                # Resync instead of bursting to catch up after a long stall
+                if slack < -period:
+                    next_tick = time.perf_counter() + period
 
         except Exception as e:
             print(f"Error in send loop: {e}")
         finally:
             self.running = False
+            self._stop_event.set()
+
+    def _state_changed(self, old, new):
+        """Check if two snapshots differ beyond AXIS_EPSILON or in buttons"""
+        if old[6] != new[6]:
+            return True
+        for old_value, new_value in zip(old[:6], new[:6]):
+            if abs(old_value - new_value) >= AXIS_EPSILON:
+                return True
+        return False
 
     def is_running(self):
         """Check if the server is running"""
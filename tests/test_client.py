@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the Xbox Controller Client link-loss fail-safe.
+"""
+
+import time
+import unittest
+
+from client.client import LINK_TIMEOUT, XboxControllerClient
+
+
+class FakeMotorController:
+    """Records motor commands instead of driving GPIO pins"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        if name not in ('forward', 'backward', 'left', 'right', 'stop',
+                        'cleanup'):
+            raise AttributeError(name)
+        return lambda *args: self.calls.append((name,) + args)
+
+
+class LinkLossTest(unittest.TestCase):
+    def setUp(self):
+        self.client = XboxControllerClient('127.0.0.1', 0, 0)
+        self.client.motor_controller.cleanup()
+        self.motors = FakeMotorController()
+        self.client.motor_controller = self.motors
+
+    def tearDown(self):
+        self.client.stop()
+
+    def frame(self, right_trigger):
+        """Controller state tuple driving forward at the given trigger"""
+        return (time.time(), 0.0, 0.0, 0.0, 0.0, 0.0, right_trigger, 0)
+
+    def names(self):
+        return [call[0] for call in self.motors.calls]
+
+    def test_lost_link_stops_motors_once(self):
+        self.client.handle_controller_state(self.frame(0.5))
+        self.motors.calls.clear()
+
+        self.client._last_frame_time = time.monotonic() - LINK_TIMEOUT
+        self.client._check_link()
+        self.client._check_link()
+
+        self.assertEqual(self.names(), ['stop'])
+
+    def test_recovered_frame_is_applied(self):
+        self.client.handle_controller_state(self.frame(0.5))
+        self.client._last_frame_time = time.monotonic() - LINK_TIMEOUT
+        self.client._check_link()
+        self.motors.calls.clear()
+
+        # The same command as before the loss must still reach the motors
+        self.client.handle_controller_state(self.frame(0.5))
+
+        self.assertIn(('forward', 50), self.motors.calls)
+
+    def test_live_link_is_left_alone(self):
+        self.client.handle_controller_state(self.frame(0.5))
+        self.motors.calls.clear()
+
+        self.client._check_link()
+
+        self.assertEqual(self.motors.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()